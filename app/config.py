@@ -20,6 +20,9 @@ OUTPUT_FILE = "nird_chunks.json"
 OUTPUT_DIR = str(DATA_DIR)
 CHUNK_SIZE = 1000
 CHUNK_OVERLAP = 200
+# Threads de scraping parallèle; le pool de connexions HTTP est
+# dimensionné sur la même valeur
+SCRAPE_MAX_WORKERS = 8
 
 # Semantic Search Configuration
 SIMILARITY_THRESHOLD = 0.12
@@ -30,7 +33,9 @@ BOOST_KEYWORDS = [
 ]
 
 # Chat-Bruti Configuration
-GROQ_API_KEY = os.getenv("GROQ_API_KEY", "")
+# Clé normalisée dès l'import (espaces et guillemets d'un .env mal quoté):
+# les consommateurs n'ont plus à la nettoyer
+GROQ_API_KEY = os.getenv("GROQ_API_KEY", "").strip().strip('"').strip("'")
 GROQ_MODEL = "llama-3.3-70b-versatile"
 CHAT_TEMPERATURE = 1.5
 CHAT_MAX_TOKENS = 200
@@ -3,16 +3,21 @@ API principale Chat-Bruti
 Orchestre le scraping, la recherche sémantique et la génération de réponses
 """
 from fastapi import FastAPI, HTTPException
-from fastapi.responses import JSONResponse
+from fastapi.responses import ORJSONResponse, StreamingResponse
+import orjson
 from pydantic import BaseModel
-from typing import Optional
+from typing import List, Optional
+import asyncio
 import logging
+from collections import OrderedDict
+from functools import lru_cache
 from datetime import datetime
 from pathlib import Path
 
 from app.config import (
     API_TITLE, API_VERSION, API_DESCRIPTION,
     NIRD_URL, OUTPUT_FILE, OUTPUT_DIR, CHUNK_SIZE, CHUNK_OVERLAP,
+    SCRAPE_MAX_WORKERS,
     SIMILARITY_THRESHOLD, MAX_CONTEXT_LENGTH, BOOST_KEYWORDS,
     GROQ_API_KEY, GROQ_MODEL, CHAT_TEMPERATURE, CHAT_MAX_TOKENS,
     CHAT_TOP_P, CHAT_BRUTI_SYSTEM_PROMPT, AUTO_SCRAPE_ON_STARTUP
@@ -20,8 +25,10 @@ from app.config import (
 
 from app.modules.scraper import WebScraper, TextChunker, JSONExporter
 from app.modules.semantic_search import SemanticSearch
+from app.modules.chat_generator import build_user_prompt
 # from app.modules.chat_generator import ChatBrutiGenerator  # On n'utilise plus la classe
-from groq import Groq  # Import direct comme dans votre code original
+import httpx
+from groq import AsyncGroq  # Client async: n'occupe pas la boucle d'événements
 
 # Configuration du logging
 logging.basicConfig(
@@ -35,15 +42,62 @@ app = FastAPI(
     title=API_TITLE,
     version=API_VERSION,
     description=API_DESCRIPTION,
+    # Sérialisation des réponses en C via orjson plutôt que json stdlib
+    default_response_class=ORJSONResponse,
 )
 
 # Variables globales
 semantic_search: Optional[SemanticSearch] = None
-groq_client: Optional[Groq] = None  # Client Groq direct
-scraper = WebScraper()
+groq_client: Optional[AsyncGroq] = None  # Client Groq async
+scraper = WebScraper(pool_maxsize=SCRAPE_MAX_WORKERS)
 chunker = TextChunker(chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP)
 exporter = JSONExporter(output_dir=OUTPUT_DIR)
 
+# Chemin du fichier de données, constant pour tout le process
+DATA_FILE = Path(OUTPUT_DIR) / OUTPUT_FILE
+
+# Message système constant, construit une fois pour tous les appels Groq.
+# Le contenu est normalisé (strip) au chargement: un préfixe strictement
+# identique d'une requête à l'autre laisse le serveur réutiliser son
+# cache de prompt sur ces ~200 tokens
+SYSTEM_MESSAGE = {"role": "system", "content": CHAT_BRUTI_SYSTEM_PROMPT.strip()}
+
+# Payload statique de la page d'accueil, assemblé une fois
+ROOT_PAYLOAD = {
+    "message": "Bienvenue sur Chat-Bruti API 🤪",
+    "version": API_VERSION,
+    "description": "Le chatbot le plus absurde du web",
+    "endpoints": {
+        "POST /chat": "Pose une question à Chat-Bruti (tout-en-un)",
+        "POST /scrape": "Force un nouveau scraping",
+        "POST /search": "Recherche sémantique seule (debug)",
+        "GET /stats": "Statistiques sur les données",
+        "GET /health": "Statut de l'API",
+        "GET /docs": "Documentation interactive"
+    }
+}
+
+# Cache LRU des réponses générées, clé (contexte, question): une même
+# question sur un même contexte ne repaye pas l'appel Groq
+_RESPONSE_CACHE_MAXSIZE = 128
+_response_cache: "OrderedDict[tuple, str]" = OrderedDict()
+
+
+def _cached_response(context: str, question: str) -> Optional[str]:
+    """Retourne la réponse en cache pour (contexte, question), ou None"""
+    key = (context, question)
+    answer = _response_cache.get(key)
+    if answer is not None:
+        _response_cache.move_to_end(key)
+    return answer
+
+
+def _store_response(context: str, question: str, answer: str):
+    """Mémorise une réponse générée, en évinçant la plus ancienne si besoin"""
+    _response_cache[(context, question)] = answer
+    if len(_response_cache) > _RESPONSE_CACHE_MAXSIZE:
+        _response_cache.popitem(last=False)
+
 
 # ============================================
 # Modèles Pydantic
@@ -52,6 +106,10 @@ exporter = JSONExporter(output_dir=OUTPUT_DIR)
 class ChatRequest(BaseModel):
     question: str
 
+class ScrapeRequest(BaseModel):
+    # Liste d'URLs à scraper en parallèle; None = URL NIRD par défaut
+    urls: Optional[List[str]] = None
+
 class ChatResponse(BaseModel):
     question: str
     response: str
@@ -73,40 +131,49 @@ class ScrapeResponse(BaseModel):
 # Fonctions utilitaires
 # ============================================
 
-def load_or_scrape_data():
-    """Charge les données existantes ou lance un scraping"""
-    global semantic_search
+@lru_cache(maxsize=1024)
+def _cached_search(question: str):
+    """Recherche sémantique mémoïsée: une question déjà vue ne repaye pas
+    la vectorisation ni le parcours de l'index (seuil et longueur fixés
+    par la config). Vidé à chaque reconstruction de l'index."""
+    return semantic_search.search(
+        query=question,
+        threshold=SIMILARITY_THRESHOLD,
+        max_context_length=MAX_CONTEXT_LENGTH
+    )
 
-    data_file = Path(OUTPUT_DIR) / OUTPUT_FILE
 
-    if data_file.exists():
-        logger.info(f"Chargement des données depuis {data_file}")
-        try:
-            data = exporter.load(OUTPUT_FILE)
-            chunks = data.get("chunks", [])
-            if chunks:
-                semantic_search = SemanticSearch(chunks, BOOST_KEYWORDS)
-                logger.info(f"✅ {len(chunks)} chunks chargés et indexés")
-                return True
-        except Exception as e:
-            logger.error(f"Erreur chargement: {e}")
-
-    # Si pas de données ou erreur, on scrape
-    if AUTO_SCRAPE_ON_STARTUP:
-        logger.info("🔄 Scraping initial en cours...")
-        return perform_scraping()
+def load_existing_data() -> bool:
+    """Charge et indexe les données existantes, si le fichier est présent"""
+    global semantic_search
+
+    # Un seul accès fichier: on tente le chargement directement plutôt que
+    # de payer un stat() exists() préalable (et sa fenêtre de course)
+    try:
+        data = exporter.load(OUTPUT_FILE)
+        chunks = data.get("chunks", [])
+        if chunks:
+            semantic_search = SemanticSearch(chunks, BOOST_KEYWORDS)
+            exporter.last_metadata = data.get("metadata", {})
+            logger.info(f"✅ {len(chunks)} chunks chargés et indexés depuis {DATA_FILE}")
+            return True
+    except FileNotFoundError:
+        logger.info(f"Pas de données existantes ({DATA_FILE})")
+    except Exception as e:
+        logger.error(f"Erreur chargement: {e}")
 
     return False
 
 
-def perform_scraping() -> bool:
-    """Effectue le scraping et l'indexation"""
+def perform_scraping(urls: Optional[List[str]] = None) -> bool:
+    """Effectue le scraping et l'indexation (plusieurs URLs en parallèle)"""
     global semantic_search
 
     try:
         # Scraping
-        logger.info(f"Scraping de {NIRD_URL}")
-        documents = scraper.scrape_multiple_urls([NIRD_URL])
+        urls = urls or [NIRD_URL]
+        logger.info(f"Scraping de {len(urls)} URL(s)")
+        documents = scraper.scrape_multiple_urls(urls, max_workers=SCRAPE_MAX_WORKERS)
 
         if not documents:
             logger.error("Aucun document scrapé")
@@ -121,6 +188,8 @@ def perform_scraping() -> bool:
 
         # Indexation
         semantic_search = SemanticSearch(chunks, BOOST_KEYWORDS)
+        # L'index vient de changer: les résultats mémoïsés sont périmés
+        _cached_search.cache_clear()
         logger.info("✅ Scraping et indexation terminés")
 
         return True
@@ -135,15 +204,19 @@ def initialize_chat_generator():
     global groq_client
 
     try:
-        # Nettoyer la clé API
-        api_key = GROQ_API_KEY.strip().strip('"').strip("'")
-        
-        if not api_key:
+        if not GROQ_API_KEY:
             logger.error("GROQ_API_KEY vide")
             return False
-        
-        # Initialisation simple comme dans votre code original
-        groq_client = Groq(api_key=api_key)
+
+        # Client async: l'appel de complétion devient await-able et la
+        # boucle d'événements reste libre pendant la requête HTTP.
+        # Le client httpx sous-jacent est réglé pour garder des connexions
+        # keep-alive vers Groq: pas de handshake TCP/TLS à chaque /chat
+        http_client = httpx.AsyncClient(
+            limits=httpx.Limits(max_keepalive_connections=10, max_connections=20),
+            timeout=httpx.Timeout(60.0, connect=5.0),
+        )
+        groq_client = AsyncGroq(api_key=GROQ_API_KEY, http_client=http_client)
         logger.info("✅ Client Groq initialisé")
         return True
     except Exception as e:
@@ -155,14 +228,35 @@ def initialize_chat_generator():
 # Événements de démarrage
 # ============================================
 
+async def _background_scrape():
+    """Scraping initial en tâche de fond, avec backoff entre les essais"""
+    # Un site NIRD momentanément injoignable ne condamne pas le démarrage,
+    # et asyncio.sleep ne bloque pas la boucle d'événements entre les essais
+    delay = 1.0
+    for attempt in range(3):
+        if await asyncio.to_thread(perform_scraping):
+            return
+        if attempt < 2:
+            logger.warning(f"Scraping initial échoué, nouvel essai dans {delay:.0f}s")
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 8.0)
+    logger.warning("⚠️ Aucune donnée disponible après le scraping initial")
+
+
 @app.on_event("startup")
 async def startup_event():
     """Initialisation au démarrage de l'API"""
     logger.info("🚀 Démarrage de Chat-Bruti API...")
 
-    # 1. Charger/scraper les données
-    if not load_or_scrape_data():
-        logger.warning("⚠️ Aucune donnée disponible au démarrage")
+    # 1. Données: chargement direct si le fichier existe; sinon le scraping
+    # part en tâche de fond et l'API accepte les connexions tout de suite,
+    # /chat répondant 503 tant que l'index n'est pas prêt
+    if not load_existing_data():
+        if AUTO_SCRAPE_ON_STARTUP:
+            logger.info("🔄 Scraping initial lancé en arrière-plan...")
+            app.state.scrape_task = asyncio.create_task(_background_scrape())
+        else:
+            logger.warning("⚠️ Aucune donnée disponible au démarrage")
 
     # 2. Initialiser le générateur
     if not initialize_chat_generator():
@@ -171,6 +265,18 @@ async def startup_event():
     logger.info("✅ Chat-Bruti API prête !")
 
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Ferme proprement les connexions poolées à l'arrêt de l'API"""
+    # Les pools keep-alive (session requests partagée, client httpx de
+    # Groq) gardent des sockets ouvertes: on les rend à l'OS ici plutôt
+    # que de laisser le ramasse-miettes s'en charger
+    if groq_client is not None:
+        await groq_client.close()
+    scraper.session.close()
+    logger.info("Connexions fermées, arrêt de Chat-Bruti API")
+
+
 # ============================================
 # Routes
 # ============================================
@@ -178,19 +284,7 @@ async def startup_event():
 @app.get("/")
 async def root():
     """Page d'accueil"""
-    return {
-        "message": "Bienvenue sur Chat-Bruti API 🤪",
-        "version": API_VERSION,
-        "description": "Le chatbot le plus absurde du web",
-        "endpoints": {
-            "POST /chat": "Pose une question à Chat-Bruti (tout-en-un)",
-            "POST /scrape": "Force un nouveau scraping",
-            "POST /search": "Recherche sémantique seule (debug)",
-            "GET /stats": "Statistiques sur les données",
-            "GET /health": "Statut de l'API",
-            "GET /docs": "Documentation interactive"
-        }
-    }
+    return ROOT_PAYLOAD
 
 
 @app.get("/health")
@@ -204,7 +298,10 @@ async def health():
     }
 
 
-@app.post("/chat", response_model=ChatResponse)
+# ChatResponse ne sert plus qu'à documenter le schéma: la réponse part
+# en dict brut via ORJSONResponse, sans re-validation Pydantic ni passage
+# par jsonable_encoder
+@app.post("/chat", responses={200: {"model": ChatResponse}})
 async def chat(request: ChatRequest):
     """
     Route principale: recherche sémantique + génération de réponse
@@ -232,27 +329,32 @@ async def chat(request: ChatRequest):
                 detail="Client Groq non disponible. Vérifiez GROQ_API_KEY."
             )
 
-        # 2. Recherche sémantique
-        search_result = semantic_search.search(
-            query=question,
-            threshold=SIMILARITY_THRESHOLD,
-            max_context_length=MAX_CONTEXT_LENGTH
-        )
+        # 2. Recherche sémantique (mémoïsée par question)
+        search_result = _cached_search(question)
 
         context = search_result["context"]
         confidence = search_result["confidence"]
 
-        # 3. Génération de réponse avec Groq (méthode simple)
-        user_prompt = (
-            f"Voici le contexte récupéré de la base de connaissances : {context} ; "
-            f"la question de l'utilisateur : {question}\n"
-            "Réponds de manière complètement absurde en détournant le contexte !"
-        )
-        
-        completion = groq_client.chat.completions.create(
+        # 3. Génération de réponse avec Groq (méthode simple),
+        # court-circuitée si la réponse est déjà en cache
+        response = _cached_response(context, question)
+        if response is not None:
+            return ORJSONResponse({
+                "question": question,
+                "response": response,
+                "context": context,
+                "confidence": confidence,
+                "source_url": search_result["source_url"],
+                "source_title": search_result["source_title"],
+                "timestamp": datetime.now().isoformat(timespec='milliseconds')
+            })
+
+        user_prompt = build_user_prompt(context, question)
+
+        completion = await groq_client.chat.completions.create(
             model=GROQ_MODEL,
             messages=[
-                {"role": "system", "content": CHAT_BRUTI_SYSTEM_PROMPT},
+                SYSTEM_MESSAGE,
                 {"role": "user", "content": user_prompt}
             ],
             temperature=CHAT_TEMPERATURE,
@@ -261,17 +363,18 @@ async def chat(request: ChatRequest):
         )
         
         response = completion.choices[0].message.content
+        _store_response(context, question, response)
 
         # 4. Retour complet
-        return ChatResponse(
-            question=question,
-            response=response,
-            context=context,
-            confidence=confidence,
-            source_url=search_result["source_url"],
-            source_title=search_result["source_title"],
-            timestamp=datetime.now().isoformat()
-        )
+        return ORJSONResponse({
+            "question": question,
+            "response": response,
+            "context": context,
+            "confidence": confidence,
+            "source_url": search_result["source_url"],
+            "source_title": search_result["source_title"],
+            "timestamp": datetime.now().isoformat(timespec='milliseconds')
+        })
 
     except HTTPException:
         raise
@@ -280,11 +383,68 @@ async def chat(request: ChatRequest):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.post("/chat/stream")
+async def chat_stream(request: ChatRequest):
+    """
+    Version streaming de /chat: les fragments de réponse partent en SSE
+    dès que Groq les produit
+
+    Le premier token arrive en quelques centaines de ms au lieu d'attendre
+    la génération complète; /chat reste disponible pour les clients qui
+    préfèrent la réponse agrégée.
+    """
+    question = request.question.strip()
+    if not question:
+        raise HTTPException(status_code=400, detail="Question vide")
+
+    if not semantic_search:
+        raise HTTPException(
+            status_code=503,
+            detail="Service de recherche non disponible. Lancez /scrape d'abord."
+        )
+
+    if not groq_client:
+        raise HTTPException(
+            status_code=503,
+            detail="Client Groq non disponible. Vérifiez GROQ_API_KEY."
+        )
+
+    search_result = _cached_search(question)
+    user_prompt = build_user_prompt(search_result["context"], question)
+
+    async def event_stream():
+        stream = await groq_client.chat.completions.create(
+            model=GROQ_MODEL,
+            messages=[
+                SYSTEM_MESSAGE,
+                {"role": "user", "content": user_prompt}
+            ],
+            temperature=CHAT_TEMPERATURE,
+            max_tokens=CHAT_MAX_TOKENS,
+            top_p=CHAT_TOP_P,
+            stream=True
+        )
+        try:
+            async for chunk in stream:
+                delta = chunk.choices[0].delta.content
+                if delta:
+                    yield b"data: " + orjson.dumps({"delta": delta}) + b"\n\n"
+        finally:
+            # Fermer le flux même si le client coupe la connexion SSE
+            await stream.close()
+        yield b"data: [DONE]\n\n"
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream")
+
+
 @app.post("/scrape", response_model=ScrapeResponse)
-async def scrape():
-    """Force un nouveau scraping du site NIRD"""
+async def scrape(request: Optional[ScrapeRequest] = None):
+    """Force un nouveau scraping (du site NIRD, ou d'une liste d'URLs)"""
     try:
-        success = perform_scraping()
+        urls = request.urls if request else None
+        # Le scraping (réseau + parsing) part dans un thread: la boucle
+        # d'événements continue de servir /chat pendant ce temps
+        success = await asyncio.to_thread(perform_scraping, urls)
 
         if not success:
             raise HTTPException(
@@ -294,12 +454,13 @@ async def scrape():
 
         stats = semantic_search.get_stats() if semantic_search else {}
 
-        return ScrapeResponse(
+        # model_construct: champs calculés en interne, déjà du bon type
+        return ScrapeResponse.model_construct(
             success=True,
             message="Scraping terminé avec succès",
             total_chunks=stats.get("total_chunks", 0),
             total_tokens=0,  # Vous pouvez ajouter ce calcul si besoin
-            output_file=str(Path(OUTPUT_DIR) / OUTPUT_FILE)
+            output_file=str(DATA_FILE)
         )
 
     except HTTPException:
@@ -325,13 +486,11 @@ async def search_only(request: ChatRequest):
         if not question:
             raise HTTPException(status_code=400, detail="Question vide")
 
-        result = semantic_search.search(
-            query=question,
-            threshold=SIMILARITY_THRESHOLD,
-            max_context_length=MAX_CONTEXT_LENGTH
-        )
+        result = _cached_search(question)
 
-        return JSONResponse(content=result)
+        # Dict brut -> bytes directement par orjson, sans passer par
+        # le jsonable_encoder de FastAPI
+        return ORJSONResponse(result)
 
     except HTTPException:
         raise
@@ -350,12 +509,17 @@ async def get_stats():
                 detail="Aucune donnée indexée"
             )
 
-        data_file = Path(OUTPUT_DIR) / OUTPUT_FILE
-        data = exporter.load(OUTPUT_FILE)
+        # Métadonnées servies depuis la mémoire: pas de reparse du fichier
+        # complet à chaque /stats; le fichier n'est relu que si l'API n'a
+        # encore ni exporté ni chargé de données
+        metadata = exporter.last_metadata
+        if metadata is None:
+            metadata = exporter.load(OUTPUT_FILE).get("metadata", {})
+            exporter.last_metadata = metadata
 
         return {
-            "data_file": str(data_file),
-            "metadata": data.get("metadata", {}),
+            "data_file": str(DATA_FILE),
+            "metadata": metadata,
             "search_stats": semantic_search.get_stats(),
             "config": {
                 "nird_url": NIRD_URL,
@@ -372,5 +536,18 @@ async def get_stats():
 
 
 if __name__ == "__main__":
+    import os
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
+    # Chaîne d'import plutôt que l'objet app: obligatoire pour workers > 1,
+    # chaque worker réimporte le module et construit son propre état
+    # (index, client Groq). uvloop et httptools (déjà fournis par
+    # uvicorn[standard]) remplacent la boucle asyncio et le parseur HTTP
+    # pur Python par leurs équivalents C
+    uvicorn.run(
+        "app.main:app",
+        host="0.0.0.0",
+        port=8000,
+        loop="uvloop",
+        http="httptools",
+        workers=int(os.getenv("WEB_CONCURRENCY", "2")),
+    )
\ No newline at end of file
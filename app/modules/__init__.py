@@ -1,14 +1,27 @@
 """
 Modules Chat-Bruti
+
+Les sous-modules sont importés paresseusement (PEP 562): importer
+app.modules ne paie pas le coût de requests/bs4/tiktoken/groq tant que
+la classe correspondante n'est pas réellement utilisée.
 """
-from .scraper import WebScraper, TextChunker, JSONExporter
-from .semantic_search import SemanticSearch
-from .chat_generator import ChatBrutiGenerator
-
-__all__ = [
-    "WebScraper",
-    "TextChunker",
-    "JSONExporter",
-    "SemanticSearch",
-    "ChatBrutiGenerator",
-]
\ No newline at end of file
+import importlib
+
+_LAZY = {
+    "WebScraper": "app.modules.scraper",
+    "TextChunker": "app.modules.scraper",
+    "JSONExporter": "app.modules.scraper",
+    "SemanticSearch": "app.modules.semantic_search",
+    "ChatBrutiGenerator": "app.modules.chat_generator",
+}
+
+__all__ = list(_LAZY)
+
+
+def __getattr__(name):
+    if name in _LAZY:
+        module = importlib.import_module(_LAZY[name])
+        obj = getattr(module, name)
+        globals()[name] = obj
+        return obj
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
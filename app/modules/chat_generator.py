@@ -2,16 +2,35 @@
 Module de génération de réponses Chat-Bruti
 Utilise Groq pour générer des réponses absurdes
 """
-from groq import Groq
-from typing import Dict
+from groq import AsyncGroq, Groq, GroqError
+from typing import AsyncIterator, Dict
 import logging
 
 logger = logging.getLogger(__name__)
 
 
+# Gabarit pré-lié: le handler ne fait plus qu'un appel de format sur une
+# chaîne déjà construite au chargement du module
+_USER_PROMPT_TEMPLATE = (
+    "Voici le contexte récupéré de la base de connaissances : {context} ; "
+    "la question de l'utilisateur : {question}\n"
+    "Réponds de manière complètement absurde en détournant le contexte !"
+).format
+
+
+def build_user_prompt(context: str, question: str) -> str:
+    """Assemble le prompt utilisateur, commun à toutes les générations"""
+    return _USER_PROMPT_TEMPLATE(context=context, question=question)
+
+
 class ChatBrutiGenerator:
     """Générateur de réponses Chat-Bruti avec Groq"""
 
+    __slots__ = (
+        'client', '_api_key', '_async_client', '_system_message',
+        'model', 'system_prompt', 'temperature', 'max_tokens', 'top_p'
+    )
+
     def __init__(
         self,
         api_key: str,
@@ -25,8 +44,12 @@ class ChatBrutiGenerator:
             raise ValueError("GROQ_API_KEY est requis")
 
         self.client = Groq(api_key=api_key)
+        self._api_key = api_key
+        self._async_client = None  # construit paresseusement pour le streaming
         self.model = model
         self.system_prompt = system_prompt
+        # Message système pré-construit, réutilisé à chaque génération
+        self._system_message = {"role": "system", "content": system_prompt}
         self.temperature = temperature
         self.max_tokens = max_tokens
         self.top_p = top_p
@@ -45,16 +68,12 @@ class ChatBrutiGenerator:
             Réponse absurde et drôle
         """
         try:
-            user_prompt = (
-                f"Voici le contexte récupéré de la base de connaissances : {context} ; "
-                f"la question de l'utilisateur : {question}\n"
-                "Réponds de manière complètement absurde en détournant le contexte !"
-            )
+            user_prompt = build_user_prompt(context, question)
 
             completion = self.client.chat.completions.create(
                 model=self.model,
                 messages=[
-                    {"role": "system", "content": self.system_prompt},
+                    self._system_message,
                     {"role": "user", "content": user_prompt}
                 ],
                 temperature=self.temperature,
@@ -67,14 +86,55 @@ class ChatBrutiGenerator:
 
             return answer
 
-        except Exception as e:
+        except GroqError as e:
+            # On ne rattrape que les erreurs de l'API Groq: un bug interne
+            # ou une annulation remonte à l'appelant au lieu d'être masqué
+            # par la réponse de fallback
             logger.error(f"Erreur lors de la génération: {e}")
-            # Réponse de fallback en cas d'erreur
             return (
                 "Oups ! Mon cerveau a planté plus vite qu'un Windows 95. "
                 "Réessaye, ou pas, je m'en fiche un peu en vrai. Yeahh ! 🤪"
             )
 
+    async def stream_response(self, context: str, question: str) -> AsyncIterator[str]:
+        """
+        Génère une réponse Chat-Bruti en streaming (async)
+
+        Yield les fragments de texte au fur et à mesure que Groq les
+        produit, sans bloquer la boucle d'événements entre deux fragments.
+
+        Args:
+            context: Contexte récupéré par la recherche sémantique
+            question: Question de l'utilisateur
+        """
+        if self._async_client is None:
+            self._async_client = AsyncGroq(api_key=self._api_key)
+
+        user_prompt = build_user_prompt(context, question)
+
+        stream = await self._async_client.chat.completions.create(
+            model=self.model,
+            messages=[
+                self._system_message,
+                {"role": "user", "content": user_prompt}
+            ],
+            temperature=self.temperature,
+            max_tokens=self.max_tokens,
+            top_p=self.top_p,
+            stream=True
+        )
+
+        try:
+            async for chunk in stream:
+                delta = chunk.choices[0].delta.content
+                if delta:
+                    yield delta
+        finally:
+            # Toujours refermer le flux HTTP, y compris si le consommateur
+            # annule l'itération en cours de route: pas de socket orpheline
+            # en attente du ramasse-miettes
+            await stream.close()
+
     def test_connection(self) -> bool:
         """Teste la connexion à l'API Groq"""
         try:
@@ -85,6 +145,6 @@ class ChatBrutiGenerator:
             )
             logger.info("Connexion Groq OK")
             return True
-        except Exception as e:
+        except GroqError as e:
             logger.error(f"Erreur connexion Groq: {e}")
             return False
\ No newline at end of file
@@ -3,35 +3,161 @@ Module de scraping pour Chat-Bruti
 Adapté du module NIRD original
 """
 import requests
+from requests.adapters import HTTPAdapter
 from bs4 import BeautifulSoup
 from typing import List, Dict
-import tiktoken
 import json
+import mmap
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 import logging
 from pathlib import Path
 from datetime import datetime
 
 logger = logging.getLogger(__name__)
 
+# Parseur HTML: lxml (tokenizer C, nettement plus rapide) si disponible,
+# sinon le html.parser pur Python de la stdlib
+try:
+    import lxml  # noqa: F401
+    HTML_PARSER = 'lxml'
+except ImportError:
+    HTML_PARSER = 'html.parser'
+
+# User-Agent envoyé sur toutes les requêtes de scraping
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+
+# Session partagée entre tous les WebScraper du process: un seul pool de
+# connexions keep-alive, quel que soit le nombre d'instances créées
+_shared_session = None
+
+
+def _get_shared_session(pool_maxsize: int = 10) -> requests.Session:
+    """Construit (une seule fois) la session HTTP partagée"""
+    global _shared_session
+    if _shared_session is None:
+        session = requests.Session()
+        # Pool urllib3 dimensionné pour le scraping parallèle: autant de
+        # connexions keep-alive que de workers, pas de recréation TCP/TLS
+        adapter = HTTPAdapter(pool_connections=pool_maxsize, pool_maxsize=pool_maxsize)
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        session.headers.update({'User-Agent': USER_AGENT})
+        _shared_session = session
+    return _shared_session
+
 
 class WebScraper:
     """Scraper de contenu web"""
 
-    def __init__(self, timeout: int = 10):
-        self.timeout = timeout
-        self.session = requests.Session()
-        self.session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-        })
+    __slots__ = ('timeout', 'max_retries', 'max_content_bytes', 'session', '_validator_cache')
 
-    def scrape_url(self, url: str) -> Dict:
+    def __init__(self, timeout=(3.05, 10), max_retries: int = 3, pool_maxsize: int = 10,
+                 session: requests.Session = None, max_content_bytes: int = 5 * 1024 * 1024):
+        # timeout (connexion, lecture): un serveur qui accepte vite mais
+        # répond lentement n'est plus confondu avec un serveur injoignable
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.max_content_bytes = max_content_bytes
+        self.session = session if session is not None else _get_shared_session(pool_maxsize)
+        # Cache de revalidation: url -> (ETag, Last-Modified, document parsé).
+        # Un re-scraping d'une page inchangée coûte un 304 au lieu d'un
+        # téléchargement + parse HTML complets
+        self._validator_cache = {}
+
+    def _get_with_retries(self, url: str, headers: Dict = None) -> requests.Response:
+        """GET avec retries et backoff exponentiel sur erreurs transitoires"""
+        # Deadline monotone: les retries ne peuvent pas dépasser 3x le timeout
+        # de lecture, quel que soit le temps passé dans les aller-retours HTTP
+        read_timeout = self.timeout[1] if isinstance(self.timeout, tuple) else self.timeout
+        deadline = time.monotonic() + read_timeout * 3
+        delay = 0.25
+        last_error = None
+
+        for attempt in range(self.max_retries):
+            try:
+                response = self.session.get(url, timeout=self.timeout, stream=True, headers=headers)
+                # On ne retente que les erreurs transitoires (429, 5xx)
+                if response.status_code == 429 or response.status_code >= 500:
+                    response.raise_for_status()
+                return response
+            except (requests.ConnectionError, requests.Timeout, requests.HTTPError) as e:
+                last_error = e
+                if attempt == self.max_retries - 1:
+                    break
+                # Respecter le header Retry-After si le serveur en fournit un
+                retry_after = None
+                if isinstance(e, requests.HTTPError) and e.response is not None:
+                    retry_after = e.response.headers.get('Retry-After')
+                    # Réponse en stream: la refermer pour rendre la connexion
+                    # au pool avant de retenter
+                    e.response.close()
+                wait = delay
+                if retry_after:
+                    # RFC 7231 autorise aussi une date HTTP: dans ce cas on
+                    # retombe sur le backoff plutôt que de faire échouer le retry
+                    try:
+                        wait = float(retry_after)
+                    except ValueError:
+                        pass
+                # Ne jamais dormir au-delà de la deadline
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                wait = min(wait, remaining)
+                logger.warning(f"Tentative {attempt + 1} échouée pour {url}, retry dans {wait:.2f}s")
+                time.sleep(wait)
+                delay = min(delay * 2, 4.0)
+
+        raise last_error
+
+    def scrape_url(self, url: str, scraped_at: str = None) -> Dict:
         """Scrape une URL et retourne le contenu structuré"""
         try:
-            response = self.session.get(url, timeout=self.timeout)
+            # Requête conditionnelle si la page a déjà été scrapée: le
+            # serveur répond 304 sans corps quand rien n'a changé
+            cached = self._validator_cache.get(url)
+            conditional_headers = {}
+            if cached:
+                etag, last_modified, _ = cached
+                if etag:
+                    conditional_headers['If-None-Match'] = etag
+                if last_modified:
+                    conditional_headers['If-Modified-Since'] = last_modified
+
+            response = self._get_with_retries(url, conditional_headers or None)
+
+            if response.status_code == 304 and cached:
+                logger.info(f"Contenu inchangé (304): {url}")
+                return dict(cached[2])
+
             response.raise_for_status()
-            response.encoding = response.apparent_encoding
 
-            soup = BeautifulSoup(response.text, 'html.parser')
+            # Téléchargement en flux par blocs dans un bytearray: pas de
+            # double tampon contenu brut + texte décodé, et une page
+            # anormalement grosse est tronquée au lieu de saturer la RAM
+            content = bytearray()
+            # Blocs de 64 Kio: moins de syscalls et de passages dans la
+            # boucle Python par page téléchargée
+            for block in response.iter_content(chunk_size=65536):
+                content += block
+                if len(content) > self.max_content_bytes:
+                    logger.warning(f"Contenu tronqué à {self.max_content_bytes} octets: {url}")
+                    response.close()
+                    break
+
+            # Le charset déclaré par le serveur évite à bs4 de le deviner;
+            # sinon bs4 sniffe le <meta charset> lui-même
+            content_type = response.headers.get('Content-Type', '')
+            declared_encoding = response.encoding if 'charset' in content_type.lower() else None
+
+            soup = BeautifulSoup(bytes(content), HTML_PARSER, from_encoding=declared_encoding)
 
             # Extraction du titre
             title = soup.find('title')
@@ -43,42 +169,73 @@ class WebScraper:
 
             # Extraction du texte
             text = soup.get_text(separator='\n', strip=True)
-            text = '\n'.join(line.strip() for line in text.splitlines() if line.strip())
+            # map/filter restent côté C: pas de frame de générateur Python
+            # par ligne sur des pages de plusieurs milliers de lignes
+            text = '\n'.join(filter(None, map(str.strip, text.split('\n'))))
 
             logger.info(f"Scraping réussi: {url} - {len(text)} caractères")
 
-            return {
+            result = {
                 'url': url,
                 'title': title,
                 'text': text,
-                'scraped_at': datetime.now().isoformat()
+                'scraped_at': scraped_at if scraped_at is not None else datetime.now().isoformat()
             }
 
+            # Mémoriser les validateurs HTTP pour les prochains scrapings
+            etag = response.headers.get('ETag')
+            last_modified = response.headers.get('Last-Modified')
+            if etag or last_modified:
+                self._validator_cache[url] = (etag, last_modified, result)
+
+            return result
+
         except Exception as e:
             logger.error(f"Erreur scraping {url}: {e}")
             return None
 
-    def scrape_multiple_urls(self, urls: List[str]) -> List[Dict]:
-        """Scrape plusieurs URLs"""
-        documents = []
-        for url in urls:
-            doc = self.scrape_url(url)
-            if doc:
-                documents.append(doc)
-        return documents
+    def scrape_multiple_urls(self, urls: List[str], max_workers: int = 8) -> List[Dict]:
+        """Scrape plusieurs URLs en parallèle (l'ordre des résultats est préservé)"""
+        # Un seul relevé d'horloge pour tout le lot: les documents d'un
+        # même scraping portent un horodatage identique
+        scrape = partial(self.scrape_url, scraped_at=datetime.now().isoformat())
+        if len(urls) <= 1:
+            documents = [scrape(url) for url in urls]
+        else:
+            with ThreadPoolExecutor(max_workers=min(max_workers, len(urls))) as executor:
+                documents = list(executor.map(scrape, urls))
+        return [doc for doc in documents if doc]
 
 
 class TextChunker:
     """Découpe le texte en chunks avec comptage de tokens"""
 
+    __slots__ = ('chunk_size', 'chunk_overlap', '_encoding', '_encoding_loaded')
+
     def __init__(self, chunk_size: int = 1000, chunk_overlap: int = 200):
+        # Lever (et non retourner) l'erreur: un overlap >= chunk_size
+        # ferait boucler le découpage sans jamais progresser
+        if not 0 <= chunk_overlap < chunk_size:
+            raise ValueError("chunk_overlap doit être dans [0, chunk_size)")
         self.chunk_size = chunk_size
         self.chunk_overlap = chunk_overlap
-        try:
-            self.encoding = tiktoken.get_encoding("cl100k_base")
-        except:
-            self.encoding = None
-            logger.warning("Tiktoken non disponible, utilisation d'une approximation")
+        self._encoding = None
+        self._encoding_loaded = False
+
+    @property
+    def encoding(self):
+        """Encodeur tiktoken, chargé paresseusement au premier comptage"""
+        if not self._encoding_loaded:
+            self._encoding_loaded = True
+            try:
+                # Import différé: tiktoken (et ses tables) ne sont chargés
+                # que si un comptage de tokens a effectivement lieu
+                import tiktoken
+                self._encoding = tiktoken.get_encoding("cl100k_base")
+            except:
+                self._encoding = None
+                logger.warning("Tiktoken non disponible, utilisation d'une approximation")
+        return self._encoding
 
     def count_tokens(self, text: str) -> int:
         """Compte les tokens dans un texte"""
@@ -88,6 +245,32 @@ class TextChunker:
             # Approximation: 1 token ≈ 4 caractères
             return len(text) // 4
 
+    def _make_chunk(self, chunk_id: int, text: str, source_url: str, source_title: str) -> Dict:
+        """Construit le dictionnaire d'un chunk (token_count rempli ensuite)"""
+        return {
+            'chunk_id': chunk_id,
+            'text': text.strip(),
+            'token_count': 0,
+            'source_url': source_url,
+            'source_title': source_title
+        }
+
+    def _fill_token_counts(self, chunks: List[Dict]) -> List[Dict]:
+        """Remplit token_count de tous les chunks en un seul appel batché"""
+        if not chunks:
+            return chunks
+        encoding = self.encoding
+        if encoding is not None:
+            # encode_ordinary_batch relâche le GIL et parallélise le BPE
+            # côté Rust: un seul aller-retour Python pour tout le lot
+            encoded = encoding.encode_ordinary_batch([c['text'] for c in chunks])
+            for chunk, tokens in zip(chunks, encoded):
+                chunk['token_count'] = len(tokens)
+        else:
+            for chunk in chunks:
+                chunk['token_count'] = self.count_tokens(chunk['text'])
+        return chunks
+
     def chunk_text(self, text: str, source_url: str, source_title: str) -> List[Dict]:
         """Découpe un texte en chunks"""
         if not text:
@@ -95,56 +278,71 @@ class TextChunker:
 
         chunks = []
         paragraphs = text.split('\n\n')
-        current_chunk = ""
+        # Accumulation en liste + longueur courante: la concaténation de
+        # chaînes recopiait le chunk en cours à chaque paragraphe (O(n²))
+        parts = []
+        current_len = 0
         chunk_id = 0
 
         for para in paragraphs:
             if not para.strip():
                 continue
 
-            if len(current_chunk) + len(para) <= self.chunk_size:
-                current_chunk += para + "\n\n"
+            if current_len + len(para) <= self.chunk_size:
+                parts.append(para)
+                current_len += len(para) + 2
             else:
-                if current_chunk:
-                    chunks.append({
-                        'chunk_id': chunk_id,
-                        'text': current_chunk.strip(),
-                        'token_count': self.count_tokens(current_chunk),
-                        'source_url': source_url,
-                        'source_title': source_title
-                    })
+                if parts:
+                    chunks.append(self._make_chunk(
+                        chunk_id, "\n\n".join(parts) + "\n\n", source_url, source_title
+                    ))
                     chunk_id += 1
 
-                # Overlap
-                current_chunk = para + "\n\n"
+                # Overlap: le nouveau chunk repart avec les derniers
+                # paragraphes du chunk émis (jusqu'à chunk_overlap
+                # caractères) pour ne pas couper le contexte à la frontière
+                overlap_parts = []
+                overlap_len = 0
+                for prev in reversed(parts):
+                    if overlap_len + len(prev) + 2 > self.chunk_overlap:
+                        break
+                    overlap_parts.append(prev)
+                    overlap_len += len(prev) + 2
+                overlap_parts.reverse()
+
+                parts = overlap_parts + [para]
+                current_len = overlap_len + len(para) + 2
 
         # Dernier chunk
-        if current_chunk:
-            chunks.append({
-                'chunk_id': chunk_id,
-                'text': current_chunk.strip(),
-                'token_count': self.count_tokens(current_chunk),
-                'source_url': source_url,
-                'source_title': source_title
-            })
+        if parts:
+            chunks.append(self._make_chunk(
+                chunk_id, "\n\n".join(parts) + "\n\n", source_url, source_title
+            ))
 
-        return chunks
+        return self._fill_token_counts(chunks)
 
     def chunk_documents(self, documents: List[Dict]) -> List[Dict]:
         """Découpe plusieurs documents en chunks"""
-        all_chunks = []
-        for doc in documents:
-            chunks = self.chunk_text(doc['text'], doc['url'], doc['title'])
-            all_chunks.extend(chunks)
-        return all_chunks
+        # Compréhension aplatie: une seule liste construite directement,
+        # sans liste intermédiaire ni extend par document
+        return [
+            chunk
+            for doc in documents
+            for chunk in self.chunk_text(doc['text'], doc['url'], doc['title'])
+        ]
 
 
 class JSONExporter:
     """Exporte les chunks en JSON"""
 
+    __slots__ = ('output_dir', 'last_metadata')
+
     def __init__(self, output_dir: str):
         self.output_dir = Path(output_dir)
         self.output_dir.mkdir(parents=True, exist_ok=True)
+        # Métadonnées du dernier export/chargement, gardées en mémoire pour
+        # que /stats ne reparse pas tout le fichier à chaque appel
+        self.last_metadata = None
 
     def export(self, chunks: List[Dict], filename: str) -> str:
         """Exporte les chunks en JSON"""
@@ -158,9 +356,18 @@ class JSONExporter:
             },
             'chunks': chunks
         }
-
-        with open(output_path, 'w', encoding='utf-8') as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
+        self.last_metadata = data['metadata']
+
+        # Sortie compacte (sans indentation): fichier ~20-30% plus petit
+        # et parse plus rapide au démarrage, le JSON reste lisible via jq
+        if orjson is not None:
+            # orjson sérialise directement en bytes UTF-8 (pas de str
+            # intermédiaire ré-encodé)
+            with open(output_path, 'wb') as f:
+                f.write(orjson.dumps(data))
+        else:
+            with open(output_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False, separators=(',', ':'))
 
         logger.info(f"Export réussi: {output_path}")
         return str(output_path)
@@ -168,5 +375,14 @@ class JSONExporter:
     def load(self, filename: str) -> Dict:
         """Charge les données depuis JSON"""
         file_path = self.output_dir / filename
-        with open(file_path, 'r', encoding='utf-8') as f:
-            return json.load(f)
\ No newline at end of file
+        with open(file_path, 'rb') as f:
+            if orjson is not None:
+                try:
+                    # mmap: le kernel pagine le fichier à la demande, et
+                    # orjson parse la memoryview sans copie intermédiaire
+                    with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                        return orjson.loads(memoryview(mm))
+                except ValueError:
+                    # Fichier vide: mmap refuse une longueur nulle
+                    f.seek(0)
+            return json.loads(f.read() or b'{}')
\ No newline at end of file
@@ -4,55 +4,237 @@ Basé sur la similarité cosinus
 """
 import re
 import math
-from collections import Counter
+import sys
+import heapq
+from array import array
+from collections import Counter, OrderedDict
 from typing import List, Dict, Optional
 import logging
 
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
 logger = logging.getLogger(__name__)
 
+# Taille du cache LRU de vecteurs de requête par instance
+_QUERY_CACHE_MAXSIZE = 512
+
+# Motif de tokenisation compilé une fois au chargement: pas de détour par
+# le cache interne de re à chaque texte vectorisé
+_WORD_RE = re.compile(r'\w+')
+
+# Contexte de repli renvoyé quand aucun chunk ne dépasse le seuil;
+# constant, donc construit une seule fois au chargement du module
+DEFAULT_CONTEXT = (
+    "La démarche NIRD promeut un numérique Inclusif, Responsable et Durable "
+    "dans les établissements scolaires via Linux, le reconditionnement et "
+    "les logiciels libres."
+)
+DEFAULT_SOURCE_URL = "https://nird.forge.apps.education.fr/"
+DEFAULT_SOURCE_TITLE = "Accueil NIRD"
+
+# Résultat de repli entièrement pré-assemblé, rendu tel quel sur le chemin
+# d'échec: les appelants (et le cache de réponses) le lisent sans le modifier,
+# comme tout résultat mémoïsé
+_DEFAULT_RESULT = {
+    "context": DEFAULT_CONTEXT,
+    "confidence": 0.0,
+    "chunk_id": -1,
+    "source_url": DEFAULT_SOURCE_URL,
+    "source_title": DEFAULT_SOURCE_TITLE,
+    "found": False
+}
+
+# Stopwords français, partagés par toutes les instances: frozenset figé
+# au chargement du module plutôt que reconstruit à chaque __init__
+STOPWORDS = frozenset({
+    "le", "la", "les", "de", "du", "des", "un", "une", "et", "ou", "à", "au", "aux",
+    "en", "dans", "sur", "pour", "par", "avec", "sans", "sous", "chez", "ce", "cette",
+    "ces", "son", "sa", "ses", "mon", "ma", "mes", "ton", "ta", "tes", "je", "tu",
+    "il", "elle", "nous", "vous", "ils", "elles", "qui", "que", "quoi", "dont", "où",
+    "quand", "comment", "mais", "est", "sont", "pas", "plus", "très"
+})
+
 
 class SemanticSearch:
     """Moteur de recherche sémantique léger"""
 
+    __slots__ = (
+        'chunks', 'boost_keywords', 'stopwords', '_stats',
+        'vocab', 'indptr', 'indices', 'data', 'norms', 'postings',
+        '_query_cache',
+        '_np_indptr', '_np_indices', '_np_data', '_np_norms', '_np_starts',
+        '_np_empty_rows', '_np_query_buf', '_np_contrib_buf',
+        '_np_scores_buf', '_np_denom_buf'
+    )
+
     def __init__(self, chunks: List[Dict], boost_keywords: List[str] = None):
         self.chunks = chunks
-        self.boost_keywords = boost_keywords or []
-        self.vectors = []
-        self.stopwords = {
-            "le", "la", "les", "de", "du", "des", "un", "une", "et", "ou", "à", "au", "aux",
-            "en", "dans", "sur", "pour", "par", "avec", "sans", "sous", "chez", "ce", "cette",
-            "ces", "son", "sa", "ses", "mon", "ma", "mes", "ton", "ta", "tes", "je", "tu",
-            "il", "elle", "nous", "vous", "ils", "elles", "qui", "que", "quoi", "dont", "où",
-            "quand", "comment", "mais", "est", "sont", "pas", "plus", "très"
-        }
+        # Normalisation une seule fois: minuscules + frozenset pour des
+        # tests d'appartenance O(1) dans la boucle de recherche
+        self.boost_keywords = frozenset(k.lower() for k in (boost_keywords or []))
+        self.stopwords = STOPWORDS
+        # Index en structure de tableaux (format CSR): les comptes de tous
+        # les chunks sont aplatis dans trois tableaux C contigus au lieu
+        # d'un Counter (table de hachage) par chunk. Types compacts: les
+        # comptes tiennent sur 16 bits (un chunk fait ~1000 caractères),
+        # les offsets et ids de tokens sur 32 — deux à quatre fois plus de
+        # corpus dans le même cache
+        self.vocab: Dict[str, int] = {}
+        self.indptr = array('I', [0])
+        self.indices = array('I')
+        self.data = array('H')
+        # Normes des vecteurs de chunks, constantes entre les requêtes:
+        # calculées une fois à l'indexation, jamais dans la boucle chaude
+        self.norms = array('d')
+        # Index inversé: id de token -> [(index de chunk, occurrences)].
+        # Une requête ne parcourt que les chunks qui partagent au moins
+        # un token avec elle, pas tout le corpus
+        self.postings: Dict[int, List] = {}
+        # Cache LRU requête -> vecteur: les flux de questions réels sont
+        # répétitifs, une question déjà vue saute la tokenisation
+        self._query_cache: "OrderedDict[str, tuple]" = OrderedDict()
+        # Les statistiques ne changent plus après l'indexation: le dict
+        # est assemblé au premier appel puis resservi tel quel
+        self._stats = None
         self._index_chunks()
 
     def _clean_and_vectorize(self, text: str) -> Counter:
         """Nettoie et vectorise un texte"""
         text = text.lower()
-        words = re.findall(r'\w+', text)
-        words = [w for w in words if w not in self.stopwords and len(w) > 2]
-        return Counter(words)
-
-    def _cosine_similarity(self, vec1: Counter, vec2: Counter) -> float:
-        """Calcule la similarité cosinus entre deux vecteurs"""
-        common = set(vec1) & set(vec2)
-        if not common:
-            return 0.0
-
-        numerator = sum(vec1[w] * vec2[w] for w in common)
-        denominator = (
-            math.sqrt(sum(v * v for v in vec1.values())) *
-            math.sqrt(sum(v * v for v in vec2.values()))
+        stopwords = self.stopwords
+        intern = sys.intern
+        # sys.intern: un même mot présent dans des dizaines de chunks ne
+        # garde qu'une seule chaîne en mémoire, et les comparaisons de clés
+        # dans les Counter se font par identité. Le générateur alimente le
+        # Counter directement, sans liste intermédiaire filtrée
+        return Counter(
+            intern(w) for w in _WORD_RE.findall(text)
+            if w not in stopwords and len(w) > 2
         )
 
-        return numerator / denominator if denominator != 0 else 0.0
-
     def _index_chunks(self):
-        """Pré-calcule les vecteurs de tous les chunks"""
+        """Pré-calcule l'index CSR de tous les chunks"""
         logger.info(f"Indexation de {len(self.chunks)} chunks...")
-        self.vectors = [self._clean_and_vectorize(chunk["text"]) for chunk in self.chunks]
-        logger.info("Indexation terminée")
+        vocab = self.vocab
+        indptr = self.indptr
+        indices = self.indices
+        data = self.data
+        norms = self.norms
+        postings = self.postings
+
+        # Tokenisation de tout le corpus en un lot: map() garde la boucle
+        # de dispatch en C, un Counter par chunk
+        counters = list(map(self._clean_and_vectorize, (chunk["text"] for chunk in self.chunks)))
+
+        # Vocabulaire d'abord, remplissage ensuite: les tableaux CSR se
+        # remplissent par extend() d'un chunk entier au lieu d'un append
+        # Python par token
+        for counter in counters:
+            for token in counter:
+                if token not in vocab:
+                    postings[len(vocab)] = []
+                    vocab[token] = len(vocab)
+
+        get_id = vocab.__getitem__
+        for chunk_index, counter in enumerate(counters):
+            token_ids = list(map(get_id, counter.keys()))
+            counts = list(counter.values())
+            indices.extend(token_ids)
+            data.extend(counts)
+            for token_id, count in zip(token_ids, counts):
+                postings[token_id].append((chunk_index, count))
+            indptr.append(len(indices))
+            norms.append(math.sqrt(sum(c * c for c in counts)))
+
+        # Miroirs numpy des tableaux CSR quand numpy est disponible: le
+        # scoring devient quelques opérations vectorisées en C au lieu
+        # d'une boucle Python par chunk
+        if np is not None and len(data):
+            self._np_indptr = np.asarray(indptr, dtype=np.int64)
+            self._np_indices = np.asarray(indices, dtype=np.int64)
+            # float32 de bout en bout: les scores sont arrondis à 3
+            # décimales, la demi-précision de bande passante est gratuite
+            self._np_data = np.asarray(data, dtype=np.float32)
+            self._np_norms = np.asarray(norms, dtype=np.float32)
+            self._np_empty_rows = np.diff(self._np_indptr) == 0
+            # Offsets de début pour reduceat: une ligne vide en fin de
+            # matrice a un offset == len(data), valide uniquement grâce à
+            # l'élément sentinelle ajouté au tampon de contributions
+            self._np_starts = self._np_indptr[:-1]
+            # Tampons de scoring pré-alloués et réutilisés à chaque requête
+            # (une seule requête à la fois sur la boucle d'événements: pas
+            # besoin de stockage par thread)
+            self._np_query_buf = np.zeros(len(vocab), dtype=np.float32)
+            # Un zéro sentinelle en fin de tampon: les offsets des lignes
+            # vides terminales pointent dessus sans décaler les voisines
+            self._np_contrib_buf = np.zeros(len(data) + 1, dtype=np.float32)
+            self._np_scores_buf = np.empty(len(self.chunks), dtype=np.float32)
+            self._np_denom_buf = np.empty(len(self.chunks), dtype=np.float32)
+        else:
+            self._np_indptr = self._np_indices = self._np_data = None
+            self._np_norms = self._np_empty_rows = self._np_starts = None
+            self._np_query_buf = self._np_contrib_buf = None
+            self._np_scores_buf = self._np_denom_buf = None
+
+        logger.info(f"Indexation terminée ({len(vocab)} tokens distincts)")
+
+    def _scores_numpy(self, query_ids: Dict[int, int], query_norm: float):
+        """Scores cosinus de tous les chunks en un seul passage vectorisé"""
+        # Tous les tableaux intermédiaires sont des tampons réutilisés:
+        # zéro allocation de la taille du corpus par requête
+        query_vec = self._np_query_buf
+        for token_id, count in query_ids.items():
+            query_vec[token_id] = count
+
+        # Produit scalaire par ligne CSR: gather + reduceat, tout en C.
+        # Seuls les len(data) premiers éléments sont écrits: le zéro
+        # sentinelle du dernier emplacement ne bouge jamais
+        contributions = self._np_contrib_buf
+        active = contributions[:-1]
+        np.take(query_vec, self._np_indices, out=active)
+        np.multiply(active, self._np_data, out=active)
+        scores = self._np_scores_buf
+        np.add.reduceat(contributions, self._np_starts, out=scores)
+
+        # Remise à zéro du vecteur requête (quelques entrées seulement)
+        for token_id in query_ids:
+            query_vec[token_id] = 0.0
+
+        # reduceat renvoie une valeur parasite pour les lignes vides
+        scores[self._np_empty_rows] = 0.0
+
+        # Normes pré-calculées à l'indexation: plus de somme de carrés
+        # ni de racine par chunk dans le chemin requête
+        denominators = self._np_denom_buf
+        np.multiply(self._np_norms, query_norm, out=denominators)
+        np.divide(scores, denominators, out=scores, where=denominators > 0.0)
+        scores[self._np_empty_rows] = 0.0
+        return scores
+
+    def _vectorize_query(self, query: str) -> Dict[int, int]:
+        """Vectorise une requête en {id de token: occurrences} (LRU)"""
+        cache = self._query_cache
+        hit = cache.get(query)
+        if hit is not None:
+            cache.move_to_end(query)
+            return hit
+
+        vocab = self.vocab
+        counts = self._clean_and_vectorize(query)
+        # Les tokens hors vocabulaire ne peuvent matcher aucun chunk: ils
+        # sont écartés d'emblée (mais comptent dans la norme de la requête)
+        result = ({
+            vocab[token]: count
+            for token, count in counts.items() if token in vocab
+        }, counts)
+
+        cache[query] = result
+        if len(cache) > _QUERY_CACHE_MAXSIZE:
+            cache.popitem(last=False)
+        return result
 
     def search(
         self,
@@ -74,25 +256,71 @@ class SemanticSearch:
         if not query.strip():
             return None
 
-        query_vector = self._clean_and_vectorize(query)
+        query_ids, query_counts = self._vectorize_query(query)
+
+        # Court-circuit: une requête sans aucun mot significatif (que des
+        # stopwords / mots trop courts) ne peut matcher aucun chunk, inutile
+        # de parcourir tout l'index
+        if not query_counts:
+            return self._default_result()
+
+        # Bonus mots-clés: il ne dépend que de la requête, donc calculé une
+        # seule fois avant la boucle et ajouté au score de chaque chunk.
+        # Test de sous-chaîne comme à l'origine: "libre" doit aussi
+        # matcher "libres", "librement", etc.
+        bonus = 0.0
+        if self.boost_keywords:
+            query_lower = query.lower()
+            bonus = 0.18 * sum(
+                1 for keyword in self.boost_keywords if keyword in query_lower
+            )
+
+        query_norm = math.sqrt(sum(v * v for v in query_counts.values()))
+
         best_score = 0.0
         best_chunk = None
         best_index = -1
+        chunks = self.chunks
 
-        query_lower = query.lower()
-
-        for i, chunk_vector in enumerate(self.vectors):
-            score = self._cosine_similarity(query_vector, chunk_vector)
+        if self._np_data is not None:
+            # Chemin numpy: tous les cosinus en un passage C, puis argmax
+            scores = self._scores_numpy(query_ids, query_norm)
+            best_index = int(scores.argmax())
+            best_score = float(scores[best_index]) + bonus
+            # Comparaison au seuil fusionnée ici: sur un échec on ne touche
+            # même pas à la liste des chunks
+            if best_score > threshold:
+                best_chunk = chunks[best_index]
+        else:
+            # Repli pur Python: accumulation par listes de diffusion.
+            # Seuls les chunks partageant au moins un token avec la
+            # requête sont touchés, au lieu d'un passage sur tout l'index
+            postings = self.postings
+            norms = self.norms
 
-            # Bonus pour mots-clés stratégiques
-            for keyword in self.boost_keywords:
-                if keyword in query_lower:
-                    score += 0.18
+            numerators: Dict[int, int] = {}
+            get_numerator = numerators.get
+            for token_id, query_count in query_ids.items():
+                for chunk_index, count in postings[token_id]:
+                    numerators[chunk_index] = (
+                        get_numerator(chunk_index, 0) + query_count * count
+                    )
 
-            if score > best_score:
-                best_score = score
-                best_chunk = self.chunks[i]
-                best_index = i
+            if numerators:
+                # Parcours trié: à score égal, le chunk de plus petit
+                # index gagne, comme dans l'ancien balayage séquentiel
+                for i in sorted(numerators):
+                    score = numerators[i] / (norms[i] * query_norm) + bonus
+                    if score > best_score:
+                        best_score = score
+                        best_chunk = chunks[i]
+                        best_index = i
+            elif bonus > 0.0 and chunks:
+                # Aucun recouvrement lexical: l'ancien balayage donnait le
+                # bonus au premier chunk, on conserve ce comportement
+                best_score = bonus
+                best_chunk = chunks[0]
+                best_index = 0
 
         # Retour du résultat
         if best_score > threshold and best_chunk:
@@ -100,7 +328,12 @@ class SemanticSearch:
 
             # Troncature si nécessaire
             if len(context) > max_context_length:
-                context = context[:max_context_length].rsplit(' ', 1)[0] + "..."
+                # rfind borné: le point de coupe est trouvé sans allouer la
+                # sous-chaîne intermédiaire que rsplit devait reparcourir
+                cut = context.rfind(' ', 0, max_context_length)
+                if cut <= 0:
+                    cut = max_context_length
+                context = context[:cut] + "..."
 
             return {
                 "context": context,
@@ -112,24 +345,73 @@ class SemanticSearch:
             }
         else:
             # Contexte par défaut si rien trouvé
-            return {
-                "context": (
-                    "La démarche NIRD promeut un numérique Inclusif, Responsable et Durable "
-                    "dans les établissements scolaires via Linux, le reconditionnement et "
-                    "les logiciels libres."
-                ),
-                "confidence": 0.0,
-                "chunk_id": -1,
-                "source_url": "https://nird.forge.apps.education.fr/",
-                "source_title": "Accueil NIRD",
-                "found": False
+            return self._default_result()
+
+    def top_chunks(self, query: str, k: int = 3) -> List[Dict]:
+        """
+        Retourne les k meilleurs chunks pour une requête (score décroissant)
+
+        Chaque élément: {"chunk_id", "score", "source_url", "source_title"}.
+        Sélection en argpartition côté numpy (O(n) au lieu d'un tri
+        complet), heapq.nlargest dans le repli pur Python.
+        """
+        if not query.strip():
+            return []
+
+        query_ids, query_counts = self._vectorize_query(query)
+        if not query_counts or not self.chunks:
+            return []
+
+        query_norm = math.sqrt(sum(v * v for v in query_counts.values()))
+        chunks = self.chunks
+
+        if self._np_data is not None:
+            scores = self._scores_numpy(query_ids, query_norm)
+            k = min(k, len(chunks))
+            top = np.argpartition(-scores, k - 1)[:k]
+            best = sorted(
+                ((int(i), float(scores[i])) for i in top),
+                key=lambda pair: pair[1], reverse=True
+            )
+        else:
+            postings = self.postings
+            norms = self.norms
+            numerators: Dict[int, int] = {}
+            get_numerator = numerators.get
+            for token_id, query_count in query_ids.items():
+                for chunk_index, count in postings[token_id]:
+                    numerators[chunk_index] = (
+                        get_numerator(chunk_index, 0) + query_count * count
+                    )
+            best = heapq.nlargest(
+                k,
+                ((i, numerator / (norms[i] * query_norm))
+                 for i, numerator in numerators.items()),
+                key=lambda pair: pair[1]
+            )
+
+        return [
+            {
+                "chunk_id": chunks[i].get("chunk_id", i),
+                "score": round(score, 3),
+                "source_url": chunks[i].get("source_url", ""),
+                "source_title": chunks[i].get("source_title", "")
             }
+            for i, score in best if score > 0.0
+        ]
+
+    def _default_result(self) -> Dict:
+        """Résultat de repli quand aucun chunk ne matche"""
+        return _DEFAULT_RESULT
 
     def get_stats(self) -> Dict:
         """Retourne des statistiques sur l'index"""
-        return {
-            "total_chunks": len(self.chunks),
-            "total_vectors": len(self.vectors),
-            "boost_keywords": self.boost_keywords,
-            "stopwords_count": len(self.stopwords)
-        }
\ No newline at end of file
+        if self._stats is None:
+            self._stats = {
+                "total_chunks": len(self.chunks),
+                "total_vectors": len(self.indptr) - 1,
+                "vocabulary_size": len(self.vocab),
+                "boost_keywords": sorted(self.boost_keywords),
+                "stopwords_count": len(self.stopwords)
+            }
+        return self._stats
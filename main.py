@@ -1,12 +1,20 @@
 from fastapi import FastAPI, HTTPException
 from pydantic import BaseModel
-from groq import Groq
+from groq import AsyncGroq
+import httpx
 import os
 
 app = FastAPI(title="Chat-Bruti", version="1.0")
 
-# Client Groq (GRATUIT !)
-client = Groq(api_key=os.getenv("GROQ_API_KEY", "TON_API_KEY")) # TON_API_KEY n'existe pas et permet de renvoyer une erreur s'il n'y a pas d'api key
+# Client Groq async (GRATUIT !): l'appel de complétion est await-able et
+# le pool httpx garde les connexions TLS chaudes entre les requêtes
+client = AsyncGroq(
+    api_key=os.getenv("GROQ_API_KEY", "TON_API_KEY"), # TON_API_KEY n'existe pas et permet de renvoyer une erreur s'il n'y a pas d'api key
+    http_client=httpx.AsyncClient(
+        limits=httpx.Limits(max_keepalive_connections=20, max_connections=50),
+        timeout=httpx.Timeout(60.0, connect=5.0),
+    ),
+)
 
 # Modèles de données
 class UserQuery(BaseModel):
@@ -32,17 +40,20 @@ Appuie-toi très vaguement sur le contexte ci-dessous, mais détourne-le complè
 Utilise des mots comme waouh, yeahh, oups, dans tes réponses
 """
 
+# Payload statique de la racine, construit une fois
+ROOT_PAYLOAD = {
+    "message": "Bienvenue sur Chat-Bruti API ",
+    "model": "llama-3.1-70b-versatile",
+    "endpoints": {
+        "/ask": "POST - Pose une question",
+        "/docs": "Documentation"
+    }
+}
+
 # root
 @app.get("/")
 async def root():
-    return {
-        "message": "Bienvenue sur Chat-Bruti API ",
-        "model": "llama-3.1-70b-versatile",
-        "endpoints": {
-            "/ask": "POST - Pose une question",
-            "/docs": "Documentation"
-        }
-    }
+    return ROOT_PAYLOAD
 
 # ask
 @app.post("/ask", response_model=ChatResponse)
@@ -57,14 +68,15 @@ async def ask_chatbruti(payload: UserQuery):
         user_prompt = f"""Voici le contexte récupéré de la base de connaissances : {context} ;
                         la question de l'utilisateur : {question}
                     Réponds de manière complètement absurde en détournant le contexte !"""
-        # Appel à Groq 
-        completion = client.chat.completions.create(
+        # Appel à Groq async: la boucle d'événements reste libre pendant
+        # toute la génération, sans thread intermédiaire
+        completion = await client.chat.completions.create(
             model="llama-3.3-70b-versatile",  # Modèle actuel et gratuit
             messages=[
                 {"role": "system", "content": CHAT_BRUTI_SYSTEM_PROMPT},
                 {"role": "user", "content": user_prompt}
             ],
-            temperature=1.5,      
+            temperature=1.5,
             max_tokens=200,
             top_p=0.95
         )
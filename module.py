@@ -2,9 +2,14 @@
 # API FastAPI – Recherche sémantique intelligente dans la base NIRD
 # Lance avec : uvicorn api_nird:app --reload
 
-import json
 import re
 import math
+
+try:
+    import orjson as _json_fast
+except ImportError:
+    _json_fast = None
+import json
 from collections import Counter
 from fastapi import FastAPI, HTTPException
 from pydantic import BaseModel
@@ -17,24 +22,35 @@ from typing import List, Dict
 
 
 
-with open('larousse_tokens.json', 'r', encoding='utf-8') as f:
-    data = json.load(f)
+# orjson parse le JSON en C, nettement plus vite que le module stdlib
+if _json_fast is not None:
+    with open('larousse_tokens.json', 'rb') as f:
+        data = _json_fast.loads(f.read())
+else:
+    with open('larousse_tokens.json', 'r', encoding='utf-8') as f:
+        data = json.load(f)
 
 chunks = data["chunks"]
 
 # ================================================
 # 2. Moteur sémantique léger (cosine similarity)
 # ================================================
+# Construit une seule fois au chargement du module: l'ancien code
+# réallouait ce set de ~50 chaînes à chaque vectorisation
+_MOT_RE = re.compile(r'\w+')
+
+STOPWORDS = frozenset({
+    "le","la","les","de","du","des","un","une","et","ou","à","au","aux","en","dans",
+    "sur","pour","par","avec","sans","sous","chez","ce","cette","ces","son","sa","ses",
+    "mon","ma","mes","ton","ta","tes","je","tu","il","elle","nous","vous","ils","elles",
+    "qui","que","quoi","dont","où","quand","comment","mais","est","sont","pas","plus","très"
+})
+
+
 def nettoyer_et_vectoriser(texte: str) -> Counter:
     texte = texte.lower()
-    mots = re.findall(r'\w+', texte)
-    stopwords = {
-        "le","la","les","de","du","des","un","une","et","ou","à","au","aux","en","dans",
-        "sur","pour","par","avec","sans","sous","chez","ce","cette","ces","son","sa","ses",
-        "mon","ma","mes","ton","ta","tes","je","tu","il","elle","nous","vous","ils","elles",
-        "qui","que","quoi","dont","où","quand","comment","mais","est","sont","pas","plus","très"
-    }
-    mots = [m for m in mots if m not in stopwords and len(m) > 2]
+    mots = _MOT_RE.findall(texte)
+    mots = [m for m in mots if m not in STOPWORDS and len(m) > 2]
     return Counter(mots)
 
 def cosine_similarity(vec1: Counter, vec2: Counter) -> float:
@@ -87,12 +103,13 @@ def chercher_dans_nird(payload: QuestionRequest):
 
     mots_forts = ["linux","reconditionnement","nird","primtux","tchap","écologique","libre","inclusif","durable","obsolescence","forge"]
 
+    # Le bonus ne dépend que de la question: calculé une seule fois au lieu
+    # de refaire question.lower() et le scan des mots forts pour chaque chunk
+    question_lower = question.lower()
+    bonus = 0.18 * sum(1 for mot in mots_forts if mot in question_lower)
+
     for i, vec_chunk in enumerate(vecteurs_chunks):
-        score = cosine_similarity(vec_q, vec_chunk)
-        # Bonus si sujet stratégique
-        for mot in mots_forts:
-            if mot in question.lower():
-                score += 0.18
+        score = cosine_similarity(vec_q, vec_chunk) + bonus
         if score > meilleur_score:
             meilleur_score = score
             meilleur_chunk = chunks[i]
@@ -101,8 +118,14 @@ def chercher_dans_nird(payload: QuestionRequest):
     if meilleur_score > 0.12:
         texte = meilleur_chunk["text"].strip()
         if len(texte) > 600:
-            texte = texte[:600].rsplit(' ', 1)[0] + "..."
-        return ReponseNIRD(
+            # rfind borné: pas de sous-chaîne intermédiaire avant la coupe
+            coupe = texte.rfind(' ', 0, 600)
+            if coupe <= 0:
+                coupe = 600
+            texte = texte[:coupe] + "..."
+        # model_construct: les champs viennent de notre propre base déjà
+        # typée, inutile de repayer la validation Pydantic à chaque requête
+        return ReponseNIRD.model_construct(
             question=question,
             contexte=texte,
             confiance=round(meilleur_score, 3),
@@ -112,7 +135,7 @@ def chercher_dans_nird(payload: QuestionRequest):
             timestamp=datetime.now().isoformat()
         )
     else:
-        return ReponseNIRD(
+        return ReponseNIRD.model_construct(
             question=question,
             contexte="La démarche NIRD promeut un numérique Inclusif, Responsable et Durable dans les établissements scolaires via Linux, le reconditionnement et les logiciels libres.",
             confiance=0.0,
@@ -1,12 +1,13 @@
 """API FastAPI pour le module de scraping NIRD"""
 
 from fastapi import FastAPI, HTTPException
-from fastapi.responses import JSONResponse
+from fastapi.responses import FileResponse, ORJSONResponse
 from pydantic import BaseModel, HttpUrl
 from typing import List, Optional
 import logging
+import time
 
-from app.config import settings
+from app import config as settings
 from app.modules.scraper import WebScraper, TextChunker, JSONExporter
 
 # Configuration du logging
@@ -18,6 +19,8 @@ app = FastAPI(
     title=settings.API_TITLE,
     version=settings.API_VERSION,
     description=settings.API_DESCRIPTION,
+    # Sérialisation des réponses en C via orjson plutôt que json stdlib
+    default_response_class=ORJSONResponse,
 )
 
 # Initialisation des modules
@@ -28,14 +31,38 @@ chunker = TextChunker(
 )
 exporter = JSONExporter(output_dir=settings.OUTPUT_DIR)
 
+# Cache TTL des données scrapées: évite de relire/parser le JSON
+# à chaque appel de /data et /data/stats
+_DATA_CACHE_TTL = 5.0
+_data_cache = {"loaded_at": 0.0, "data": None}
+
+
+def load_data_cached():
+    """Charge les données scrapées avec un cache TTL en mémoire"""
+    now = time.monotonic()
+    if _data_cache["data"] is not None and now - _data_cache["loaded_at"] < _DATA_CACHE_TTL:
+        return _data_cache["data"]
+    data = exporter.load(settings.OUTPUT_FILE)
+    _data_cache["data"] = data
+    _data_cache["loaded_at"] = now
+    return data
+
+
+def invalidate_data_cache():
+    """Invalide le cache après un nouveau scraping"""
+    _data_cache["data"] = None
+    _data_cache["loaded_at"] = 0.0
+
 
 # Modèles Pydantic
 class ScrapeRequest(BaseModel):
     """Requête de scraping"""
 
     urls: List[HttpUrl]
-    chunk_size: Optional[int] = settings.CHUNK_SIZE
-    chunk_overlap: Optional[int] = settings.CHUNK_OVERLAP
+    # None = sentinelle: la valeur de config est résolue au moment de la
+    # requête, pas figée à la création de la classe
+    chunk_size: Optional[int] = None
+    chunk_overlap: Optional[int] = None
 
 
 class ScrapeResponse(BaseModel):
@@ -93,13 +120,14 @@ async def scrape_urls(request: ScrapeRequest):
             )
 
         # Configurer le chunker si nécessaire
-        if (
-            request.chunk_size != settings.CHUNK_SIZE
-            or request.chunk_overlap != settings.CHUNK_OVERLAP
-        ):
+        chunk_size = request.chunk_size if request.chunk_size is not None else settings.CHUNK_SIZE
+        chunk_overlap = (
+            request.chunk_overlap if request.chunk_overlap is not None else settings.CHUNK_OVERLAP
+        )
+        if chunk_size != settings.CHUNK_SIZE or chunk_overlap != settings.CHUNK_OVERLAP:
             custom_chunker = TextChunker(
-                chunk_size=request.chunk_size,
-                chunk_overlap=request.chunk_overlap,
+                chunk_size=chunk_size,
+                chunk_overlap=chunk_overlap,
             )
         else:
             custom_chunker = chunker
@@ -112,13 +140,15 @@ async def scrape_urls(request: ScrapeRequest):
 
         # Exporter en JSON
         output_file = exporter.export(chunks, settings.OUTPUT_FILE)
+        invalidate_data_cache()
 
         logger.info(
             f"Scraping terminé: {len(documents)} docs, "
             f"{len(chunks)} chunks, {total_tokens} tokens"
         )
 
-        return ScrapeResponse(
+        # model_construct: champs calculés en interne, déjà du bon type
+        return ScrapeResponse.model_construct(
             success=True,
             message="Scraping terminé avec succès",
             total_documents=len(documents),
@@ -142,17 +172,15 @@ async def get_scraped_data():
     Returns:
         Données scrapées avec métadonnées
     """
-    try:
-        data = exporter.load(settings.OUTPUT_FILE)
-        return JSONResponse(content=data)
-    except FileNotFoundError:
+    # Le JSON est servi tel quel depuis le disque: pas de parse puis
+    # re-sérialisation en mémoire d'un fichier potentiellement volumineux
+    file_path = exporter.output_dir / settings.OUTPUT_FILE
+    if not file_path.exists():
         raise HTTPException(
             status_code=404,
             detail="Aucune donnée scrapée trouvée. Lancez d'abord un scraping.",
         )
-    except Exception as e:
-        logger.error(f"Erreur lors de la lecture des données: {e}")
-        raise HTTPException(status_code=500, detail=str(e))
+    return FileResponse(file_path, media_type="application/json")
 
 
 @app.get("/data/stats")
@@ -164,18 +192,19 @@ async def get_data_stats():
         Statistiques sur les données
     """
     try:
-        data = exporter.load(settings.OUTPUT_FILE)
+        data = load_data_cached()
         chunks = data.get("chunks", [])
 
-        # Calculer les statistiques
+        # Calculer les statistiques en une seule passe sur les chunks
         total_chunks = len(chunks)
-        total_tokens = sum(chunk.get("token_count", 0) for chunk in chunks)
-        total_chars = sum(len(chunk.get("text", "")) for chunk in chunks)
-
-        # Compter les sources uniques
-        unique_sources = len(
-            set(chunk.get("source_url", "") for chunk in chunks)
-        )
+        total_tokens = 0
+        total_chars = 0
+        sources = set()
+        for chunk in chunks:
+            total_tokens += chunk.get("token_count", 0)
+            total_chars += len(chunk.get("text", ""))
+            sources.add(chunk.get("source_url", ""))
+        unique_sources = len(sources)
 
         return {
             "total_chunks": total_chunks,